@@ -1,14 +1,20 @@
+import functools
 import os
 import platform
+import re
 import shutil
 import stat
+import struct
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from .exception import DarwinException
 
+# the machine type is invariant, and platform.machine() is not cheap
+_MACHINE = platform.machine()
+
 # In a MachO file, need to deal specially with links that use @executable_path,
 # @loader_path, @rpath
 #
@@ -22,18 +28,118 @@ from .exception import DarwinException
 # directories are included in the current rpath.
 
 
+# Magic numbers of thin (32/64-bit, both byte orders) and fat Mach-O files.
+_MACHO_MAGIC = frozenset(
+    {
+        b"\xfe\xed\xfa\xce",  # MH_MAGIC
+        b"\xce\xfa\xed\xfe",  # MH_CIGAM
+        b"\xfe\xed\xfa\xcf",  # MH_MAGIC_64
+        b"\xcf\xfa\xed\xfe",  # MH_CIGAM_64
+    }
+)
+_MACHO_FAT_MAGIC = frozenset(
+    {
+        b"\xca\xfe\xba\xbe",  # FAT_MAGIC
+        b"\xbe\xba\xfe\xca",  # FAT_CIGAM
+        b"\xca\xfe\xba\xbf",  # FAT_MAGIC_64
+        b"\xbf\xba\xfe\xca",  # FAT_CIGAM_64
+    }
+)
+
+
+# Suffixes of resource files that are commonly copied into a frozen
+# application and can not be Mach-O files (those are not even read).
+_NON_MACHO_SUFFIXES = frozenset(
+    {
+        ".cfg",
+        ".css",
+        ".csv",
+        ".gif",
+        ".h",
+        ".html",
+        ".icns",
+        ".ico",
+        ".ini",
+        ".jpg",
+        ".js",
+        ".json",
+        ".md",
+        ".mo",
+        ".nib",
+        ".pem",
+        ".plist",
+        ".png",
+        ".po",
+        ".py",
+        ".pyc",
+        ".pyi",
+        ".qm",
+        ".rst",
+        ".svg",
+        ".toml",
+        ".ttf",
+        ".txt",
+        ".xml",
+        ".yaml",
+        ".zip",
+    }
+)
+
+
 def _isMachOFile(path: Path) -> bool:
-    """Determines whether the file is a Mach-O file."""
-    if not path.is_file():
+    """Determines whether the file is a Mach-O file, based on its magic
+    number."""
+    return _isMachOFileCached(os.fspath(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _isMachOFileCached(path: str) -> bool:
+    # the same rpath candidates are probed for many files in a freeze
+    if os.path.splitext(path)[1].lower() in _NON_MACHO_SUFFIXES:
+        return False
+    try:
+        if not os.path.isfile(path):
+            return False
+        with open(path, "rb", buffering=0) as fp:
+            header = fp.read(8)
+    except OSError:
         return False
-    if b"Mach-O" in subprocess.check_output(("file", path)):
+    magic = header[:4]
+    if magic in _MACHO_MAGIC:
         return True
+    if magic in _MACHO_FAT_MAGIC and len(header) == 8:
+        # Java class files share the fat magic number; they are told apart
+        # by the second word, which for a fat binary is the (small) number
+        # of architectures and for a class file is the (large) version.
+        byteorder = "big" if magic[:1] == b"\xca" else "little"
+        return int.from_bytes(header[4:], byteorder) < 20
     return False
 
 
+@functools.lru_cache(maxsize=None)
+def _realPath(path: str) -> Path:
+    """Returns the resolved path (cached, since the same directories and
+    libraries are resolved for many files)."""
+    return Path(os.path.realpath(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _pathExists(path: str) -> bool:
+    return os.path.exists(path)
+
+
 class MachOReference:
     """Represents a linking reference from MachO file to another file."""
 
+    # there is one instance for each load command of each copied file
+    __slots__ = (
+        "source_file",
+        "raw_path",
+        "resolved_path",
+        "is_copied",
+        "target_file",
+    )
+
     def __init__(
         self,
         source_file: "DarwinFile",
@@ -87,7 +193,7 @@ class DarwinFile:
         :param strict: Do not make guesses about rpath resolution. If the
         load does not resolve, throw an Exception.
         """
-        self.path = Path(path).resolve()
+        self.path = _realPath(os.fspath(path))
         self.referencing_file: Optional["DarwinFile"] = None
         self.strict = strict
 
@@ -105,12 +211,12 @@ class DarwinFile:
         # (or None, if no resolution was determined)
         self.libraryPathResolution: Dict[str, Optional[Path]] = {}
         # the is of entries in the rpath in effect for this file.
-        self._rpath: Optional[List[Path]] = None
+        self._rpath: Optional[Tuple[Path, ...]] = None
 
-        # dictionary of MachOReference objects, by their paths.
+        # dictionary of MachOReference objects, by their paths (as str).
         # Path used is the resolved path, if available, and otherwise the
         # unresolved load path.
-        self.machOReferenceForTargetPath: Dict[Path, MachOReference] = {}
+        self.machOReferenceForTargetPath: Dict[str, MachOReference] = {}
 
         if not _isMachOFile(self.path):
             self.isMachO = False
@@ -119,12 +225,12 @@ class DarwinFile:
         # if this is a MachO file, extract linking information from it
         self.isMachO = True
         self.commands = MachOCommand._getMachOCommands(self.path)
-        self.loadCommands = [
-            c for c in self.commands if isinstance(c, MachOLoadCommand)
-        ]
-        self.rpathCommands = [
-            c for c in self.commands if isinstance(c, MachORPathCommand)
-        ]
+        for command in self.commands:
+            command_type = type(command)
+            if command_type is MachOLoadCommand:
+                self.loadCommands.append(command)
+            elif command_type is MachORPathCommand:
+                self.rpathCommands.append(command)
         self.referencing_file = referencing_file
 
         self.getRPath()
@@ -135,9 +241,9 @@ class DarwinFile:
         for raw_path, resolved_path in self.libraryPathResolution.items():
             # the path to use for storing in dictionary
             if resolved_path is None:
-                dict_path = Path(raw_path)
+                dict_path = os.fspath(Path(raw_path))
             else:
-                dict_path = resolved_path
+                dict_path = os.fspath(resolved_path)
             if dict_path in self.machOReferenceForTargetPath:
                 raise DarwinException(
                     "Multiple dynamic libraries resolved to the same file."
@@ -240,10 +346,11 @@ class DarwinFile:
         )
 
     def resolveRPath(self, path: str) -> Optional[Path]:
+        tail = path.replace("@rpath/", "", 1)
         for rp in self.getRPath():
-            test_path = rp / path.replace("@rpath/", "", 1)
-            if _isMachOFile(test_path):
-                return test_path
+            test_path = os.path.join(rp, tail)
+            if _isMachOFileCached(test_path):
+                return Path(test_path)
         if not self.strict:
             # If not strictly enforcing rpath, return None here, and leave any
             # error to .finalizeReferences() instead.
@@ -252,44 +359,53 @@ class DarwinFile:
         self.printFileInformation()
         raise DarwinException(f"resolveRPath() failed to resolve path: {path}")
 
-    def getRPath(self) -> List[Path]:
+    def getRPath(self) -> Tuple[Path, ...]:
         """Returns the rpath in effect for this file. Determined by rpath
         commands in this file and (recursively) the chain of files that
-        referenced this file."""
+        referenced this file. The result is immutable, so that files without
+        rpath commands share the rpath of the referencing file."""
         if self._rpath is not None:
             return self._rpath
         raw_paths = [c.rpath for c in self.rpathCommands]
         rpath = []
         for rp in raw_paths:
-            test_rp = Path(rp)
-            if test_rp.is_absolute():
-                rpath.append(test_rp)
+            if os.path.isabs(rp):
+                rpath.append(Path(rp))
             elif self.isLoaderPath(rp):
-                rpath.append(self.resolveLoader(rp).resolve())
+                rpath.append(_realPath(os.fspath(self.resolveLoader(rp))))
             elif self.isExecutablePath(rp):
-                rpath.append(self.resolveExecutable(rp).resolve())
-        rpath = [rp for rp in rpath if rp.exists()]
+                rpath.append(_realPath(os.fspath(self.resolveExecutable(rp))))
+        rpath = tuple(rp for rp in rpath if _pathExists(os.fspath(rp)))
 
         if self.referencing_file is not None:
-            rpath = self.referencing_file.getRPath() + rpath
+            parent_rpath = self.referencing_file.getRPath()
+            rpath = parent_rpath + rpath if rpath else parent_rpath
         self._rpath = rpath
         return rpath
 
+    # special prefix of load paths and the name of its resolver method, by
+    # the first two characters of the prefix (which are distinct)
+    _resolver_for_prefix = {
+        "@l": ("@loader_path", "resolveLoader"),
+        "@e": ("@executable_path", "resolveExecutable"),
+        "@r": ("@rpath", "resolveRPath"),
+    }
+
     def resolvePath(self, path: str) -> Optional[Path]:
         """Resolves any @executable_path, @loader_path, and @rpath references
         in a path."""
-        if self.isLoaderPath(path):  # replace @loader_path
-            return self.resolveLoader(path)
-        if self.isExecutablePath(path):  # replace @executable_path
-            return self.resolveExecutable(path)
-        if self.isRPath(path):  # replace @rpath
-            return self.resolveRPath(path)
+        # replace @loader_path, @executable_path, @rpath
+        prefix_resolver = self._resolver_for_prefix.get(path[:2])
+        if prefix_resolver is not None:
+            prefix, resolver_name = prefix_resolver
+            if path.startswith(prefix):
+                return getattr(self, resolver_name)(path)
         test_path = Path(path)
         if test_path.is_absolute():  # just use the path, if it is absolute
             return test_path
         test_path = self.path.parent / path
         if _isMachOFile(test_path):
-            return test_path.resolve()
+            return _realPath(os.fspath(test_path))
         raise DarwinException(f"Could not resolve path: {path}")
 
     def resolveLibraryPaths(self):
@@ -315,7 +431,7 @@ class DarwinFile:
         stored in self.machOReferenceTargetPath. Raises Exception if not
         available."""
         try:
-            return self.machOReferenceForTargetPath[path]
+            return self.machOReferenceForTargetPath[os.fspath(path)]
         except KeyError:
             raise DarwinException(
                 f"Path {path} is not a path referenced from DarwinFile"
@@ -325,71 +441,92 @@ class DarwinFile:
 class MachOCommand:
     """Represents a load command in a MachO file."""
 
+    __slots__ = ("_head",)
+
     def __init__(self, lines: List[str]):
-        self.lines = lines
+        # only the first two lines are kept, for display
+        self._head = tuple(line.strip() for line in lines[:2])
 
     def displayString(self) -> str:
-        l: List[str] = []
-        if len(self.lines) > 0:
-            l.append(self.lines[0].strip())
-        if len(self.lines) > 1:
-            l.append(self.lines[1].strip())
-        return " / ".join(l)
+        return " / ".join(self._head)
 
     def __repr__(self):
         return f"<MachOCommand ({self.displayString()})>"
 
+    # load commands already read, by (resolved) path of the file
+    _commands_for_path: Dict[Path, List["MachOCommand"]] = {}
+
     @staticmethod
     def _getMachOCommands(path: Path) -> List["MachOCommand"]:
-        """Returns a list of load commands in the specified file, using
-        otool."""
-        shell_command = ("otool", "-l", path)
-        commands: List[MachOCommand] = []
-        current_command_lines = None
-
-        # split the output into separate load commands
-        out = subprocess.check_output(shell_command, encoding="utf-8")
-        for line in out.splitlines():
-            line = line.strip()
-            if line[:12] == "Load command":
-                if current_command_lines is not None:
-                    commands.append(
-                        MachOCommand.parseLines(current_command_lines)
-                    )
-                current_command_lines = []
-            if current_command_lines is not None:
-                current_command_lines.append(line)
-        if current_command_lines is not None:
-            commands.append(MachOCommand.parseLines(current_command_lines))
+        """Returns a list of load commands in the specified file."""
+        commands = MachOCommand._commands_for_path.get(path)
+        if commands is None:
+            commands = MachOCommand._getMachOCommandsBatch([path])[path]
         return commands
 
     @staticmethod
-    def parseLines(lines: List[str]) -> "MachOCommand":
-        if len(lines) < 2:
-            return MachOCommand(lines)
-        parts = lines[1].split(" ")
-        if parts[0] != "cmd":
-            return MachOCommand(lines)
-        if parts[1] == "LC_LOAD_DYLIB":
-            return MachOLoadCommand(lines)
-        if parts[1] == "LC_RPATH":
-            return MachORPathCommand(lines)
-        return MachOCommand(lines)
+    def _getMachOCommandsBatch(
+        paths: List[Path],
+    ) -> Dict[Path, List["MachOCommand"]]:
+        """Returns the load commands of each of the specified files, read
+        directly from the Mach-O headers or, for files that cannot be parsed
+        that way, using a single otool invocation. The results are cached for
+        later use by _getMachOCommands."""
+        commands_for_path: Dict[Path, List[MachOCommand]] = {}
+        pending: List[Path] = []
+        for path in paths:
+            try:
+                commands_for_path[path] = _readMachOCommands(path)
+            except (OSError, ValueError, struct.error):
+                pending.append(path)
+        # cache these first, so they are kept even if otool fails below
+        MachOCommand._commands_for_path.update(commands_for_path)
+        if pending:
+            otool_commands = MachOCommand._getOtoolCommands(pending)
+            MachOCommand._commands_for_path.update(otool_commands)
+            commands_for_path.update(otool_commands)
+        return commands_for_path
+
+    @staticmethod
+    def _getOtoolCommands(
+        paths: List[Path],
+    ) -> Dict[Path, List["MachOCommand"]]:
+        """Returns the load commands of each of the specified files, using a
+        single otool invocation."""
+        shell_command = ("otool", "-l", *paths)
+        path_for_name = {os.fsencode(path): path for path in paths}
+        commands_for_path: Dict[Path, List[MachOCommand]] = {
+            path: [] for path in paths
+        }
+
+        # otool prints a "path:" (or "path (architecture arch):") header
+        # before the output for each file; locate them to split the output
+        # (which is not decoded, only the few fields used are)
+        out = subprocess.check_output(shell_command)
+        sections = []
+        for match in _RE_OTOOL_FILE.finditer(out):
+            path = path_for_name.get(match.group(1))
+            if path is not None:
+                sections.append((path, match.end()))
+        ends = [start for _, start in sections[1:]] + [len(out)]
+        for (path, start), end in zip(sections, ends):
+            commands = commands_for_path[path]
+            for match in _RE_OTOOL_COMMAND.finditer(out, start, end):
+                index, name, string = match.groups()
+                if string is not None:
+                    string = os.fsdecode(string)
+                commands.append(
+                    _makeMachOCommand(int(index), name.decode(), string)
+                )
+        return commands_for_path
 
 
 class MachOLoadCommand(MachOCommand):
-    def __init__(self, lines: List[str]):
+    __slots__ = ("load_path",)
+
+    def __init__(self, lines: List[str], load_path: Optional[str] = None):
         super().__init__(lines)
-        self.load_path = None
-        if len(self.lines) < 4:
-            return
-        pathline = self.lines[3]
-        pathline = pathline.strip()
-        if not pathline.startswith("name "):
-            return
-        pathline = pathline[4:].strip()
-        pathline = pathline.split("(offset")[0].strip()
-        self.load_path = pathline
+        self.load_path = load_path
 
     def getPath(self):
         return self.load_path
@@ -399,23 +536,146 @@ class MachOLoadCommand(MachOCommand):
 
 
 class MachORPathCommand(MachOCommand):
-    def __init__(self, lines: List[str]):
+    __slots__ = ("rpath",)
+
+    def __init__(self, lines: List[str], rpath: Optional[str] = None):
         super().__init__(lines)
-        self.rpath = None
-        if len(self.lines) < 4:
-            return
-        pathline = self.lines[3]
-        pathline = pathline.strip()
-        if not pathline.startswith("path "):
-            return
-        pathline = pathline[4:].strip()
-        pathline = pathline.split("(offset")[0].strip()
-        self.rpath = pathline
+        self.rpath = rpath
 
     def __repr__(self):
         return f"<RPath path={self.rpath!r}>"
 
 
+# header of the output of each file, and a load command with the fields that
+# are used, in the output of otool -l
+_RE_OTOOL_FILE = re.compile(rb"^(\S.*?)(?: \(architecture \S+\))?:$", re.M)
+_RE_OTOOL_COMMAND = re.compile(
+    rb"^Load command (\d+)\n\s*cmd (\S+)\n\s*cmdsize \d+$"
+    rb"(?:\n\s*(?:name|path) (.*) \(offset \d+\)$)?",
+    re.M,
+)
+
+
+def _makeMachOCommand(
+    index: int, name: str, string: Optional[str] = None
+) -> MachOCommand:
+    """Returns the MachOCommand object for a load command, given its index,
+    its name and, for the dylib and rpath commands, the (decoded) path. The
+    lines are those that otool prints first, used only for display."""
+    lines = [f"Load command {index}", f"cmd {name}"]
+    if name == "LC_LOAD_DYLIB":
+        return MachOLoadCommand(lines, string)
+    if name == "LC_RPATH":
+        return MachORPathCommand(lines, string)
+    return MachOCommand(lines)
+
+
+# Mach-O structures used to read the load commands without otool
+# (see mach-o/loader.h and mach-o/fat.h)
+_FAT_HEADER = struct.Struct(">II")  # magic, nfat_arch
+_FAT_ARCH = struct.Struct(">iiIII")  # cputype, cpusubtype, offset, size, align
+_MACHO_HEADER_SIZE = {
+    # magic: (byte order, size of mach_header or mach_header_64)
+    b"\xfe\xed\xfa\xce": (">", 28),
+    b"\xce\xfa\xed\xfe": ("<", 28),
+    b"\xfe\xed\xfa\xcf": (">", 32),
+    b"\xcf\xfa\xed\xfe": ("<", 32),
+}
+# magic, cputype, cpusubtype, filetype, ncmds, sizeofcmds, flags
+_MACH_HEADER = {order: struct.Struct(f"{order}IiiIIII") for order in "<>"}
+# cmd, cmdsize
+_LOAD_COMMAND = {order: struct.Struct(f"{order}II") for order in "<>"}
+# offset of the string (lc_str) in a dylib or rpath command
+_LC_STR = {order: struct.Struct(f"{order}I") for order in "<>"}
+_HOST_CPU_TYPE = {"arm64": 0x0100000C, "x86_64": 0x01000007}.get(_MACHINE)
+
+_LC_REQ_DYLD = 0x80000000
+_LC_LOAD_DYLIB = 0xC
+_LC_RPATH = 0x1C | _LC_REQ_DYLD
+_LOAD_COMMAND_NAMES = {
+    0x1: "LC_SEGMENT",
+    0x2: "LC_SYMTAB",
+    0xB: "LC_DYSYMTAB",
+    _LC_LOAD_DYLIB: "LC_LOAD_DYLIB",
+    0xD: "LC_ID_DYLIB",
+    0xE: "LC_LOAD_DYLINKER",
+    0x18 | _LC_REQ_DYLD: "LC_LOAD_WEAK_DYLIB",
+    0x19: "LC_SEGMENT_64",
+    0x1B: "LC_UUID",
+    _LC_RPATH: "LC_RPATH",
+    0x1D: "LC_CODE_SIGNATURE",
+    0x1F | _LC_REQ_DYLD: "LC_REEXPORT_DYLIB",
+    0x22 | _LC_REQ_DYLD: "LC_DYLD_INFO_ONLY",
+    0x26: "LC_FUNCTION_STARTS",
+    0x28 | _LC_REQ_DYLD: "LC_MAIN",
+    0x29: "LC_DATA_IN_CODE",
+    0x2A: "LC_SOURCE_VERSION",
+    0x32: "LC_BUILD_VERSION",
+    0x33 | _LC_REQ_DYLD: "LC_DYLD_EXPORTS_TRIE",
+    0x34 | _LC_REQ_DYLD: "LC_DYLD_CHAINED_FIXUPS",
+}
+
+
+def _readMachOCommands(path: Path) -> List[MachOCommand]:
+    """Returns a list of load commands in the specified file, reading the
+    Mach-O headers directly. For a universal (fat) file, only the slice of
+    the host architecture is read if present, otherwise all of them, in the
+    same way as otool. Raises ValueError if the file cannot be parsed."""
+    with open(path, "rb") as fp:
+        magic = fp.read(4)
+        if magic not in _MACHO_FAT_MAGIC:
+            return _readMachOSlice(fp, 0)
+        if magic != b"\xca\xfe\xba\xbe":
+            raise ValueError(f"Unsupported fat Mach-O file: {path}")
+        fp.seek(0)
+        _, nfat_arch = _FAT_HEADER.unpack(fp.read(_FAT_HEADER.size))
+        arch_data = fp.read(nfat_arch * _FAT_ARCH.size)
+        archs = [
+            _FAT_ARCH.unpack_from(arch_data, i * _FAT_ARCH.size)
+            for i in range(nfat_arch)
+        ]
+        host_archs = [arch for arch in archs if arch[0] == _HOST_CPU_TYPE]
+        commands: List[MachOCommand] = []
+        for _, _, offset, _, _ in host_archs[:1] or archs:
+            commands.extend(_readMachOSlice(fp, offset))
+        return commands
+
+
+def _readMachOSlice(fp, offset: int) -> List[MachOCommand]:
+    """Reads the load commands of the (thin) Mach-O file starting at the
+    given offset of the open file."""
+    fp.seek(offset)
+    magic = fp.read(4)
+    try:
+        byte_order, header_size = _MACHO_HEADER_SIZE[magic]
+    except KeyError:
+        raise ValueError("Not a Mach-O file") from None
+    mach_header = _MACH_HEADER[byte_order]
+    load_command = _LOAD_COMMAND[byte_order]
+    lc_str = _LC_STR[byte_order]
+    fp.seek(offset)
+    header = mach_header.unpack(fp.read(mach_header.size))
+    ncmds, sizeofcmds = header[4], header[5]
+    fp.seek(offset + header_size)
+    data = fp.read(sizeofcmds)
+
+    commands: List[MachOCommand] = []
+    position = 0
+    for index in range(ncmds):
+        cmd, cmdsize = load_command.unpack_from(data, position)
+        if cmdsize < load_command.size or position + cmdsize > len(data):
+            raise ValueError("Invalid load command size")
+        name = _LOAD_COMMAND_NAMES.get(cmd, f"{cmd:#x}")
+        string = None
+        if cmd in (_LC_LOAD_DYLIB, _LC_RPATH):
+            (str_offset,) = lc_str.unpack_from(data, position + 8)
+            raw = data[position + str_offset : position + cmdsize]
+            string = os.fsdecode(raw.split(b"\0", 1)[0])
+        commands.append(_makeMachOCommand(index, name, string))
+        position += cmdsize
+    return commands
+
+
 def _printFile(
     darwinFile: DarwinFile,
     seenFiles: Set[DarwinFile],
@@ -434,13 +694,11 @@ def _printFile(
         if not ref.is_copied:
             continue
         mf = ref.target_file
-        _printFile(
-            mf,
-            seenFiles=seenFiles,
-            level=level + 1,
-            noRecurse=(mf in seenFiles),
-        )
+        # mark the file as seen before descending into it, so that shared
+        # (or circular) references are only expanded once
+        seen = mf in seenFiles
         seenFiles.add(mf)
+        _printFile(mf, seenFiles=seenFiles, level=level + 1, noRecurse=seen)
     return
 
 
@@ -457,20 +715,33 @@ def changeLoadReference(
 ):
     """Utility function that uses intall_name_tool to change oldReference to
     newReference in the machO file specified by fileName."""
-    if VERBOSE:
-        print("Redirecting load reference for ", end="")
-        print(f"<{fileName}> {oldReference} -> {newReference}")
+    changeLoadReferences(fileName, {oldReference: newReference}, VERBOSE)
+
+
+def changeLoadReferences(
+    fileName: str, references: Dict[str, str], VERBOSE: bool = True
+):
+    """Utility function that uses intall_name_tool to change each old
+    reference (key) to the new reference (value) in the machO file specified
+    by fileName, with a single invocation."""
+    if not references:
+        return
+    args = ["install_name_tool"]
+    for oldReference, newReference in references.items():
+        if VERBOSE:
+            print("Redirecting load reference for ", end="")
+            print(f"<{fileName}> {oldReference} -> {newReference}")
+        args.extend(("-change", oldReference, newReference))
+    args.append(fileName)
     original = os.stat(fileName).st_mode
     newMode = original | stat.S_IWUSR
     os.chmod(fileName, newMode)
-    subprocess.call(
-        ("install_name_tool", "-change", oldReference, newReference, fileName)
-    )
+    subprocess.call(args)
     os.chmod(fileName, original)
 
 
 def applyAdHocSignature(fileName: str):
-    if platform.machine() != "arm64":
+    if _MACHINE != "arm64":
         return
 
     args = (
@@ -499,14 +770,25 @@ class DarwinFileTracker:
         # list of DarwinFile objects for files being copied into project
         self._copied_file_list: List[DarwinFile] = []
 
+        # the following mappings are keyed by paths as str, which are cheaper
+        # to hash and compare than Path objects
+
         # mapping of (build directory) target paths to DarwinFile objects
-        self._darwin_file_for_build_path: Dict[Path, DarwinFile] = {}
+        self._darwin_file_for_build_path: Dict[str, DarwinFile] = {}
 
         # mapping of (source location) paths to DarwinFile objects
-        self._darwin_file_for_source_path: Dict[Path, DarwinFile] = {}
+        self._darwin_file_for_source_path: Dict[str, DarwinFile] = {}
 
         # a cache of MachOReference objects pointing to a given source path
-        self._reference_cache: Dict[Path, MachOReference] = {}
+        self._reference_cache: Dict[str, MachOReference] = {}
+
+        # mapping of file names to the DarwinFile objects copied with that
+        # name (in the order they were copied)
+        self._darwin_files_for_name: Dict[str, List[DarwinFile]] = {}
+
+        # references from the copied files that are not yet marked as copied
+        # (a dict is used as an ordered set)
+        self._pending_references: Dict[MachOReference, None] = {}
 
     def __iter__(self) -> Iterable[DarwinFile]:
         return iter(self._copied_file_list)
@@ -514,7 +796,7 @@ class DarwinFileTracker:
     def pathIsAlreadyCopiedTo(self, target_path: Path) -> bool:
         """Check if the given target_path has already has a file copied to
         it."""
-        if target_path in self._darwin_file_for_build_path:
+        if os.fspath(target_path) in self._darwin_file_for_build_path:
             return True
         return False
 
@@ -527,7 +809,9 @@ class DarwinFileTracker:
         # check that the target file came from the specified source
         targetDarwinFile: DarwinFile
         try:
-            targetDarwinFile = self._darwin_file_for_build_path[target_path]
+            targetDarwinFile = self._darwin_file_for_build_path[
+                os.fspath(target_path)
+            ]
         except KeyError:
             raise DarwinException(
                 f"File {target_path} already copied to, "
@@ -558,25 +842,60 @@ class DarwinFileTracker:
                 f"(target_path={target_path})"
             )
 
+        source_path = os.fspath(darwin_file.path)
         self._copied_file_list.append(darwin_file)
-        self._darwin_file_for_build_path[target_path] = darwin_file
-        self._darwin_file_for_source_path[darwin_file.path] = darwin_file
+        self._darwin_file_for_build_path[os.fspath(target_path)] = darwin_file
+        self._darwin_file_for_source_path[source_path] = darwin_file
+        self._darwin_files_for_name.setdefault(
+            darwin_file.path.name, []
+        ).append(darwin_file)
+        for reference in darwin_file.getMachOReferenceList():
+            if not reference.is_copied:
+                self._pending_references[reference] = None
+
+    def setReferenceTarget(
+        self, reference: MachOReference, darwin_file: DarwinFile
+    ):
+        """Record that the file referenced by reference was copied, as the
+        given DarwinFile."""
+        reference.setTargetFile(darwin_file)
+        self._pending_references.pop(reference, None)
 
     def cacheReferenceTo(self, source_path: Path, reference: MachOReference):
-        self._reference_cache[source_path] = reference
+        self._reference_cache[os.fspath(source_path)] = reference
 
     def getCachedReferenceTo(
         self, source_path: Path
     ) -> Optional[MachOReference]:
-        return self._reference_cache.get(source_path)
+        return self._reference_cache.get(os.fspath(source_path))
+
+    def prefetchMachOCommands(self, paths: Iterable[Path]):
+        """Reads the load commands of the Mach-O files in paths that were not
+        read yet, in one batch, so that the DarwinFile objects created for
+        them later find them cached. The headers are parsed directly; only
+        the files that cannot be parsed that way share one otool
+        invocation."""
+        pending = []
+        for path in paths:
+            path = _realPath(os.fspath(path))
+            if path not in MachOCommand._commands_for_path and _isMachOFile(
+                path
+            ):
+                pending.append(path)
+        if len(pending) < 2:
+            return
+        try:
+            MachOCommand._getMachOCommandsBatch(pending)
+        except subprocess.CalledProcessError:
+            # leave it to the DarwinFile objects to report the failing file
+            pass
 
     def findDarwinFileForFilename(self, filename: str) -> Optional[DarwinFile]:
         """Attempts to locate a copied DarwinFile with the specified filename
         and returns that. Otherwise returns None."""
-        basename = Path(filename).name
-        for df in self._copied_file_list:
-            if df.path.name == basename:
-                return df
+        darwin_files = self._darwin_files_for_name.get(Path(filename).name)
+        if darwin_files:
+            return darwin_files[0]
         return None
 
     def finalizeReferences(self):
@@ -592,43 +911,47 @@ class DarwinFileTracker:
            freeze process."""
         copied_file: DarwinFile
         reference: MachOReference
-        for copied_file in self._copied_file_list:
-            for reference in copied_file.getMachOReferenceList():
-                if not reference.is_copied:
-                    if reference.isResolved():
-                        # if reference is resolve, simply check if the resolved
-                        # path was otherwise copied and lookup the DarwinFile
-                        # object.
-                        target_path = reference.resolved_path.resolve()
-                        if target_path in self._darwin_file_for_source_path:
-                            reference.setTargetFile(
-                                self._darwin_file_for_source_path[target_path]
-                            )
-                    else:
-                        # if reference is not resolved, look through the copied
-                        # files and try to find a candidate, and use it if
-                        # found.
-                        potential_target = self.findDarwinFileForFilename(
-                            reference.raw_path
-                        )
-                        if potential_target is None:
-                            # If we cannot find any likely candidate, fail.
-                            print(
-                                "\nERROR: Could not resolve RPath "
-                                f"[{reference.raw_path}] in file "
-                                f"[{copied_file.path}], and could "
-                                "not find any likely intended reference."
-                            )
-                            copied_file.printFileInformation()
-                            raise DarwinException(
-                                f"finalizeReferences() failed to resolve path "
-                                f"[{reference.raw_path}] in file "
-                                f"[{copied_file.path}]."
-                            )
-                        print(
-                            f"WARNING: In file [{copied_file.path}]"
-                            f" guessing that {reference.raw_path} "
-                            f"resolved to {potential_target.path}."
-                        )
-                        reference.resolved_path = potential_target.path
-                        reference.setTargetFile(potential_target)
+        for reference in list(self._pending_references):
+            if reference.is_copied:
+                continue
+            copied_file = reference.source_file
+            if reference.isResolved():
+                # if reference is resolve, simply check if the resolved
+                # path was otherwise copied and lookup the DarwinFile
+                # object.
+                target_path = os.fspath(
+                    _realPath(os.fspath(reference.resolved_path))
+                )
+                if target_path in self._darwin_file_for_source_path:
+                    self.setReferenceTarget(
+                        reference,
+                        self._darwin_file_for_source_path[target_path],
+                    )
+            else:
+                # if reference is not resolved, look through the copied
+                # files and try to find a candidate, and use it if
+                # found.
+                potential_target = self.findDarwinFileForFilename(
+                    reference.raw_path
+                )
+                if potential_target is None:
+                    # If we cannot find any likely candidate, fail.
+                    print(
+                        "\nERROR: Could not resolve RPath "
+                        f"[{reference.raw_path}] in file "
+                        f"[{copied_file.path}], and could "
+                        "not find any likely intended reference."
+                    )
+                    copied_file.printFileInformation()
+                    raise DarwinException(
+                        f"finalizeReferences() failed to resolve path "
+                        f"[{reference.raw_path}] in file "
+                        f"[{copied_file.path}]."
+                    )
+                print(
+                    f"WARNING: In file [{copied_file.path}]"
+                    f" guessing that {reference.raw_path} "
+                    f"resolved to {potential_target.path}."
+                )
+                reference.resolved_path = potential_target.path
+                self.setReferenceTarget(reference, potential_target)
@@ -216,7 +216,8 @@ class ModuleFinder:
                             f"No module named {sub_module_name!r}"
                         )
                 else:
-                    module.global_names.add(name)
+                    # file names are not interned like the names in code
+                    module.global_names.add(sys.intern(name))
                     if sub_module.path and recursive:
                         self._import_all_sub_modules(
                             sub_module, deferred_imports, recursive
@@ -882,7 +882,7 @@ class DarwinFreezer(Freezer, Parser):
         darwin_file = DarwinFile(source, referencing_file)
         darwin_file.setBuildPath(target)
         if reference is not None:
-            reference.setTargetFile(darwin_file)
+            self.darwinTracker.setReferenceTarget(reference, darwin_file)
 
         self.darwinTracker.recordCopiedFile(target, darwin_file)
         if (
@@ -892,7 +892,9 @@ class DarwinFreezer(Freezer, Parser):
             # Always copy dependent files on root directory
             # to allow to set relative reference
             targetdir = self.targetdir
-            for dependent in self.get_dependent_files(source, darwin_file):
+            dependent_files = self.get_dependent_files(source, darwin_file)
+            self.darwinTracker.prefetchMachOCommands(dependent_files)
+            for dependent in dependent_files:
                 target = targetdir / dependent.name
                 reference = darwin_file.getMachOReferenceForPath(dependent)
                 self._copy_file_recursion(
@@ -924,8 +926,8 @@ class DarwinFreezer(Freezer, Parser):
                 # If file was already copied, and we are following a reference
                 # from a DarwinFile, then we need to tell the reference where
                 # the file was copied to (so the reference can later be updated).
-                reference.setTargetFile(
-                    self.darwinTracker.getDarwinFile(source, target)
+                self.darwinTracker.setReferenceTarget(
+                    reference, self.darwinTracker.getDarwinFile(source, target)
                 )
             return
         if source == target:
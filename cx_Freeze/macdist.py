@@ -11,7 +11,7 @@ from cx_Freeze.darwintools import (
     DarwinFile,
     DarwinFileTracker,
     applyAdHocSignature,
-    changeLoadReference,
+    changeLoadReferences,
 )
 
 __all__ = ["bdist_dmg", "bdist_mac"]
@@ -268,6 +268,7 @@ class bdist_mac(Command):
             out = subprocess.check_output(
                 ("otool", "-L", filename), encoding="utf-8"
             )
+            references = {}
             for line in out.splitlines()[1:]:
                 lib = line.lstrip("\t").split(" (compat")[0]
 
@@ -279,15 +280,8 @@ class bdist_mac(Command):
                     # see if we provide the referenced file;
                     # if so, change the reference
                     if name in files:
-                        subprocess.call(
-                            (
-                                "install_name_tool",
-                                "-change",
-                                lib,
-                                replacement,
-                                filename,
-                            )
-                        )
+                        references[lib] = replacement
+            changeLoadReferences(filename, references, VERBOSE=False)
             applyAdHocSignature(filename)
 
     def setRelativeReferencePaths(self, buildDir: str, binDir: str):
@@ -312,6 +306,7 @@ class bdist_mac(Command):
             # reference as necessary; if the file is copied into the binary
             # package, change the reference to be relative to @executable_path
             # (so an .app bundle will work wherever it is moved)
+            references = {}
             for reference in darwinFile.getMachOReferenceList():
                 if not reference.is_copied:
                     # referenced file not copied -- assume this is a system
@@ -328,13 +323,11 @@ class bdist_mac(Command):
                     absoluteBuildDest, buildDir
                 )
                 exePath = f"@executable_path/{relativeBuildDest}"
-                changeLoadReference(
-                    filePathInBinDir,
-                    oldReference=rawPath,
-                    newReference=exePath,
-                    VERBOSE=False,
-                )
+                references[rawPath] = exePath
 
+            # all the references of the file are changed at once, then the
+            # file is signed again (any change invalidates the signature)
+            changeLoadReferences(filePathInBinDir, references, VERBOSE=False)
             applyAdHocSignature(filePathInBinDir)
 
     def find_qt_menu_nib(self):
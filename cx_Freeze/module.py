@@ -2,9 +2,12 @@
 Base class for module.
 """
 
-import datetime
-import socket
+import os
+import shutil
+import sys
+from ast import literal_eval
 from contextlib import suppress
+from functools import lru_cache
 from keyword import iskeyword
 from pathlib import Path
 from types import CodeType
@@ -17,10 +20,61 @@ from .exception import ConfigError
 __all__ = ["ConstantsModule", "Module"]
 
 
+@lru_cache(maxsize=None)
+def _distributions() -> Dict[str, importlib_metadata.Distribution]:
+    """Return the installed distribution packages by normalized name, found
+    in a single scan of sys.path (the first one found for a name is used,
+    like Distribution.from_name does)."""
+    distributions = {}
+    for distribution in importlib_metadata.distributions():
+        # older importlib_metadata return the raw dist-info stem here
+        name = getattr(distribution, "_normalized_name", None)
+        if name is None:
+            name = distribution.metadata["Name"]
+            if name is None:
+                continue
+        name = importlib_metadata.Prepared.normalize(name)
+        distributions.setdefault(name, distribution)
+    return distributions
+
+
+@lru_cache(maxsize=None)
+def _required_names(name: str) -> Tuple[str, ...]:
+    """Return the names of the distribution packages required by the given
+    one, without duplicates (a name can be listed once per extra)."""
+    try:
+        requires = importlib_metadata.requires(name) or []
+    except importlib_metadata.PackageNotFoundError:
+        return ()
+    return tuple(dict.fromkeys(req.partition(" ")[0] for req in requires))
+
+
+@lru_cache(maxsize=None)
+def _cx_freeze_version() -> str:
+    """Return the version of the installed cx_Freeze (cached)."""
+    return importlib_metadata.version(Path(__file__).parent.name)
+
+
+@lru_cache(maxsize=None)
+def _short_hostname() -> str:
+    """Return the host name without the domain (cached)."""
+    import socket  # pylint: disable=import-outside-toplevel
+
+    return socket.gethostname().split(".", 1)[0]
+
+
 class DistributionCache(importlib_metadata.PathDistribution):
     """Cache the distribution package."""
 
-    _cachedir = TemporaryPath()
+    # normalized names of distributions not found (stdlib modules and so on)
+    _missing: Set[str] = set()
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _cache_root() -> TemporaryPath:
+        """Return the temporary directory for the cached dist-info files,
+        created on first use."""
+        return TemporaryPath()
 
     @staticmethod
     def at(path: Union[str, Path]):
@@ -30,43 +84,80 @@ class DistributionCache(importlib_metadata.PathDistribution):
 
     @classmethod
     def from_name(cls, name: str):
-        distribution = super().from_name(name)
+        # names are normalized, so that aliases share the cache
+        normalized_name = sys.intern(
+            importlib_metadata.Prepared.normalize(name)
+        )
+        if normalized_name in cls._missing:
+            raise importlib_metadata.PackageNotFoundError(name)
+        try:
+            return cls._from_name(normalized_name)
+        except importlib_metadata.PackageNotFoundError:
+            cls._missing.add(normalized_name)
+            raise
+
+    from_name.__doc__ = importlib_metadata.PathDistribution.from_name.__doc__
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _from_name(cls, name: str):
+        distribution = _distributions().get(name)
+        if distribution is None:
+            distribution = super().from_name(name)
 
         # Cache dist-info files in a temporary directory
         normalized_name = getattr(distribution, "_normalized_name", None)
         if normalized_name is None:
             normalized_name = importlib_metadata.Prepared.normalize(name)
+        target_name = f"{normalized_name}-{distribution.version}.dist-info"
+        target_path = cls._cache_root().path / target_name
+        if (target_path / "RECORD").is_file():
+            # already cached (RECORD is written last)
+            return cls.at(target_path)
+
         source_path = getattr(distribution, "_path", None)
         if source_path is None:
-            mask = f"{normalized_name}-{distribution.version}*-info"
-            source_path = list(distribution.locate_file("").glob(mask))[0]
-        if not source_path.exists():
+            # first entry matching "{normalized_name}-{version}*-info"
+            prefix = f"{normalized_name}-{distribution.version}"
+            prefix = os.path.normcase(prefix)
+            with os.scandir(distribution.locate_file("")) as entries:
+                for entry in entries:
+                    entry_name = os.path.normcase(entry.name)
+                    if entry_name.startswith(prefix) and entry_name.endswith(
+                        "-info"
+                    ):
+                        source_path = Path(entry.path)
+                        break
+        if source_path is None or not source_path.exists():
             raise importlib_metadata.PackageNotFoundError(name)
 
-        target_name = f"{normalized_name}-{distribution.version}.dist-info"
-        target_path = cls._cachedir.path / target_name
-        target_path.mkdir(exist_ok=True)
+        # only left over from an interrupted copy if it already exists
+        with suppress(FileExistsError):
+            target_path.mkdir()
 
         purelib = None
         if source_path.name.endswith(".dist-info"):
-            for source in source_path.iterdir():  # type: Path
-                target = target_path / source.name
-                target.write_bytes(source.read_bytes())
+            with os.scandir(source_path) as entries:
+                for entry in entries:
+                    # subdirectories (like licenses) are not cached, and
+                    # RECORD is recreated once the other files are in place
+                    if entry.is_file() and entry.name != "RECORD":
+                        shutil.copyfile(entry.path, target_path / entry.name)
         elif source_path.is_file():
             # old egg-info file is converted to dist-info
             target = target_path / "METADATA"
-            target.write_bytes(source_path.read_bytes())
+            shutil.copyfile(source_path, target)
             purelib = (source_path.parent / (normalized_name + ".py")).exists()
         else:
             # Copy minimal data from egg-info directory into dist-info
             source = source_path / "PKG-INFO"
             if source.is_file():
                 target = target_path / "METADATA"
-                target.write_bytes(source.read_bytes())
+                shutil.copyfile(source, target)
             source = source_path / "top_level.txt"
             if source.is_file():
                 target = target_path / "top_level.txt"
-                target.write_bytes(source.read_bytes())
+                shutil.copyfile(source, target)
             purelib = not source_path.joinpath("not-zip-safe").is_file()
 
         cls._write_wheel_distinfo(target_path, purelib)
@@ -74,15 +165,13 @@ class DistributionCache(importlib_metadata.PathDistribution):
 
         return cls.at(target_path)
 
-    from_name.__doc__ = importlib_metadata.PathDistribution.from_name.__doc__
-
     @staticmethod
     def _write_wheel_distinfo(target_path: Path, purelib: bool):
         """Create WHEEL if it doesn't exist"""
         target = target_path / "WHEEL"
         if not target.exists():
             project = Path(__file__).parent.name
-            version = importlib_metadata.version(project)
+            version = _cx_freeze_version()
             root_is_purelib = "true" if purelib else "false"
             text = [
                 "Wheel-Version: 1.0",
@@ -90,18 +179,23 @@ class DistributionCache(importlib_metadata.PathDistribution):
                 f"Root-Is-Purelib: {root_is_purelib}",
                 "Tag: py3-none-any",
             ]
-            target.write_text("\n".join(text))
+            with target.open("w", encoding="utf-8", newline="") as file:
+                file.write("\n".join(text))
 
     @staticmethod
     def _write_record_distinfo(target_path: Path):
         """Recreate minimal RECORD file"""
         target_name = target_path.name
-        record = []
-        for file in target_path.iterdir():
-            record.append(f"{target_name}/{file.name},,")
+        with os.scandir(target_path) as entries:
+            record = [
+                f"{target_name}/{entry.name},,"
+                for entry in entries
+                if entry.name != "RECORD"
+            ]
         record.append(f"{target_name}/RECORD,,")
         target = target_path / "RECORD"
-        target.write_text("\n".join(record), encoding="utf-8")
+        with target.open("w", encoding="utf-8", newline="") as file:
+            file.write("\n".join(record))
 
 
 class Module:
@@ -118,10 +212,14 @@ class Module:
     ):
         self.name: str = name
         self.path: Optional[List[Path]] = (
-            [Path(p) for p in path] if path else None
+            [p if isinstance(p, Path) else Path(p) for p in path]
+            if path
+            else None
         )
         self.file = file_name
         self.parent: Optional["Module"] = parent
+        # the top-level package holds in_file_system for all its submodules
+        self._root: "Module" = self if parent is None else parent._root
         self.code: Optional[CodeType] = None
         self.distribution: Optional[DistributionCache] = None
         self.exclude_names: Set[str] = set()
@@ -141,7 +239,9 @@ class Module:
 
     @file.setter
     def file(self, file_name: Optional[Union[Path, str]]):
-        self._file: Optional[Path] = Path(file_name) if file_name else None
+        if file_name and not isinstance(file_name, Path):
+            file_name = Path(file_name)
+        self._file: Optional[Path] = file_name or None
 
     def update_distribution(self, name: str) -> None:
         """Update the distribution cache based on its name.
@@ -156,12 +256,7 @@ class Module:
             distribution = None
         if distribution is None:
             return
-        try:
-            requires = importlib_metadata.requires(distribution.name) or []
-        except importlib_metadata.PackageNotFoundError:
-            requires = []
-        for req in requires:
-            req_name = req.partition(" ")[0]
+        for req_name in _required_names(distribution.name):
             with suppress(importlib_metadata.PackageNotFoundError):
                 DistributionCache.from_name(req_name)
         self.distribution = distribution
@@ -180,11 +275,10 @@ class Module:
         0. in a zip file (not directly in the file system)
         1. in the file system, package with modules and data
         2. in the file system, only detected modules."""
-        if self.parent is not None:
-            return self.parent.in_file_system
-        if self.path is None or self.file is None:
+        root = self._root
+        if root.path is None or root.file is None:
             return 0
-        return self._in_file_system
+        return root._in_file_system
 
     @in_file_system.setter
     def in_file_system(self, value: int) -> None:
@@ -211,47 +305,55 @@ class ConstantsModule:
         self.values["BUILD_COPYRIGHT"] = copyright_string
         if constants:
             for constant in constants:
-                parts = constant.split("=", maxsplit=1)
-                if len(parts) == 1:
-                    name = constant
-                    value = None
+                name, sep, string_value = constant.partition("=")
+                if sep:
+                    string_value = string_value.strip()
+                    try:
+                        value = literal_eval(string_value)
+                    except (SyntaxError, ValueError):
+                        # not a Python literal, use the unparsed string
+                        value = string_value
                 else:
-                    name, string_value = parts
-                    value = eval(string_value)
-                if (not name.isidentifier()) or iskeyword(name):
+                    value = None
+                if not name.isidentifier() or iskeyword(name):
                     raise ConfigError(
                         f"Invalid constant name in ConstantsModule ({name!r})"
                     )
                 self.values[name] = value
         self.module_path: TemporaryPath = TemporaryPath("constants.py")
+        # set by the first call to create, then kept for this build
+        self._build_timestamp: Optional[str] = None
 
     def create(self, modules: List[Module]) -> Tuple[Path, str]:
         """
         Create the module which consists of declaration statements for each
         of the values.
         """
-        today = datetime.datetime.today()
+        # only needed here, not imported for every use of cx_Freeze
+        import datetime  # pylint: disable=import-outside-toplevel
+
+        if self._build_timestamp is None:
+            today = datetime.datetime.today()
+            self._build_timestamp = today.strftime(self.time_format)
         source_timestamp = 0
         for module in modules:
             if module.file is None or module.source_is_string:
                 continue
             if module.source_is_zip_file:
                 continue
-            if not module.file.exists():
+            try:
+                timestamp = os.stat(module.file).st_mtime
+            except FileNotFoundError:
                 raise ConfigError(
                     f"No file named {module.file!s} (for module {module.name})"
-                )
-            timestamp = module.file.stat().st_mtime
+                ) from None
             source_timestamp = max(source_timestamp, timestamp)
         stamp = datetime.datetime.fromtimestamp(source_timestamp)
-        self.values["BUILD_TIMESTAMP"] = today.strftime(self.time_format)
-        self.values["BUILD_HOST"] = socket.gethostname().split(".")[0]
+        self.values["BUILD_TIMESTAMP"] = self._build_timestamp
+        self.values["BUILD_HOST"] = _short_hostname()
         self.values["SOURCE_TIMESTAMP"] = stamp.strftime(self.time_format)
-        source_parts = []
-        names = list(self.values.keys())
-        names.sort()
-        for name in names:
-            value = self.values[name]
-            source_parts.append(f"{name} = {value!r}")
+        source_parts = [
+            f"{name} = {self.values[name]!r}" for name in sorted(self.values)
+        ]
         self.module_path.path.write_text("\n".join(source_parts))
         return self.module_path.path, self.module_name
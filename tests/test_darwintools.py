@@ -0,0 +1,234 @@
+import os
+import struct
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from cx_Freeze import darwintools
+from cx_Freeze.darwintools import (
+    MachOCommand,
+    MachOLoadCommand,
+    MachORPathCommand,
+    _isMachOFileCached,
+    _readMachOCommands,
+)
+
+CPU_TYPE_X86_64 = 0x01000007
+CPU_TYPE_ARM64 = 0x0100000C
+LC_SEGMENT_64 = 0x19
+LC_LOAD_DYLIB = 0xC
+LC_RPATH = 0x8000001C
+
+
+def lc_str(cmd, string, byte_order):
+    """Build a load command with a string (dylib or rpath command)."""
+    data = string.encode() + b"\0"
+    size = (12 + len(data) + 7) // 8 * 8
+    header = struct.pack(f"{byte_order}III", cmd, size, 12)
+    return header + data.ljust(size - 12, b"\0")
+
+
+def thin(load_paths, rpaths=(), byte_order="<", is64=True):
+    """Build the headers of a thin Mach-O file."""
+    commands = [struct.pack(f"{byte_order}II", LC_SEGMENT_64, 16) + bytes(8)]
+    commands += [lc_str(LC_LOAD_DYLIB, p, byte_order) for p in load_paths]
+    commands += [lc_str(LC_RPATH, p, byte_order) for p in rpaths]
+    body = b"".join(commands)
+    magic = 0xFEEDFACF if is64 else 0xFEEDFACE
+    header = struct.pack(
+        f"{byte_order}IiiIIII",
+        magic,
+        CPU_TYPE_X86_64,
+        0,
+        6,
+        len(commands),
+        len(body),
+        0,
+    )
+    if is64:
+        header += bytes(4)
+    return header + body
+
+
+def fat(slices):
+    """Build a universal (fat) file from (cputype, thin data) pairs."""
+    header = struct.pack(">II", 0xCAFEBABE, len(slices))
+    archs = b""
+    data = b""
+    for cputype, slice_data in slices:
+        offset = 4096 + len(data)
+        archs += struct.pack(">iiIII", cputype, 0, offset, len(slice_data), 12)
+        data += slice_data.ljust(4096, b"\0")
+    return (header + archs).ljust(4096, b"\0") + data
+
+
+def load_paths(commands):
+    return [c.load_path for c in commands if type(c) is MachOLoadCommand]
+
+
+@pytest.mark.parametrize("byte_order", ["<", ">"])
+@pytest.mark.parametrize("is64", [True, False])
+def test_read_thin(tmp_path, byte_order, is64):
+    path = tmp_path / "libthin.dylib"
+    path.write_bytes(
+        thin(
+            ["/usr/lib/libz.dylib", "@rpath/libfoo.dylib"],
+            ["@loader_path"],
+            byte_order,
+            is64,
+        )
+    )
+    commands = _readMachOCommands(path)
+    assert [c.displayString() for c in commands] == [
+        "Load command 0 / cmd LC_SEGMENT_64",
+        "Load command 1 / cmd LC_LOAD_DYLIB",
+        "Load command 2 / cmd LC_LOAD_DYLIB",
+        "Load command 3 / cmd LC_RPATH",
+    ]
+    assert load_paths(commands) == [
+        "/usr/lib/libz.dylib",
+        "@rpath/libfoo.dylib",
+    ]
+    assert [c.rpath for c in commands if type(c) is MachORPathCommand] == [
+        "@loader_path"
+    ]
+
+
+def test_read_fat_host_slice(tmp_path, monkeypatch):
+    """Only the slice of the host architecture is read."""
+    monkeypatch.setattr(darwintools, "_HOST_CPU_TYPE", CPU_TYPE_ARM64)
+    path = tmp_path / "libfat.dylib"
+    path.write_bytes(
+        fat(
+            [
+                (CPU_TYPE_X86_64, thin(["/x86_64/libz.dylib"])),
+                (CPU_TYPE_ARM64, thin(["/arm64/libz.dylib"])),
+            ]
+        )
+    )
+    assert load_paths(_readMachOCommands(path)) == ["/arm64/libz.dylib"]
+
+
+def test_read_fat_without_host_slice(tmp_path, monkeypatch):
+    """All the slices are read if there is none for the host."""
+    monkeypatch.setattr(darwintools, "_HOST_CPU_TYPE", None)
+    path = tmp_path / "libfat.dylib"
+    path.write_bytes(
+        fat(
+            [
+                (CPU_TYPE_X86_64, thin(["/x86_64/libz.dylib"])),
+                (CPU_TYPE_ARM64, thin(["/arm64/libz.dylib"])),
+            ]
+        )
+    )
+    assert load_paths(_readMachOCommands(path)) == [
+        "/x86_64/libz.dylib",
+        "/arm64/libz.dylib",
+    ]
+
+
+def test_read_truncated_command(tmp_path):
+    data = bytearray(thin(["/usr/lib/libz.dylib"]))
+    # make the dylib command (after the 32-byte header and the 16-byte
+    # segment command) extend past the end of the load commands
+    struct.pack_into("<I", data, 32 + 16 + 4, 4096)
+    path = tmp_path / "libtruncated.dylib"
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        _readMachOCommands(path)
+
+
+def test_read_not_macho(tmp_path):
+    path = tmp_path / "libnot.dylib"
+    path.write_bytes(b"\x7fELF" + bytes(60))
+    with pytest.raises(ValueError):
+        _readMachOCommands(path)
+
+
+def test_is_macho_file(tmp_path):
+    thin_path = tmp_path / "libthin.dylib"
+    thin_path.write_bytes(thin([]))
+    fat_path = tmp_path / "libfat.dylib"
+    fat_path.write_bytes(fat([(CPU_TYPE_X86_64, thin([]))]))
+    # a 64-bit fat file is detected, and left to otool to read
+    fat64_path = tmp_path / "libfat64.dylib"
+    fat64_path.write_bytes(bytes.fromhex("cafebabf00000002") + bytes(64))
+    fat64_cigam_path = tmp_path / "libfat64cigam.dylib"
+    fat64_cigam_path.write_bytes(bytes.fromhex("bfbafeca02000000") + bytes(64))
+    # a Java class file has the same magic number as a fat file, followed
+    # by the (minor and major) version instead of the number of archs
+    class_path = tmp_path / "Main.class"
+    class_path.write_bytes(bytes.fromhex("cafebabe00000034") + bytes(8))
+    text_path = tmp_path / "readme"
+    text_path.write_text("not a Mach-O file")
+    assert _isMachOFileCached(str(thin_path))
+    assert _isMachOFileCached(str(fat_path))
+    assert _isMachOFileCached(str(fat64_path))
+    assert _isMachOFileCached(str(fat64_cigam_path))
+    with pytest.raises(ValueError):
+        _readMachOCommands(fat64_path)
+    assert not _isMachOFileCached(str(class_path))
+    assert not _isMachOFileCached(str(text_path))
+    assert not _isMachOFileCached(str(tmp_path / "missing"))
+
+
+OTOOL_OUTPUT = b"""\
+/build/lib/libone.dylib:
+Load command 0
+      cmd LC_SEGMENT_64
+  cmdsize 72
+  segname __PAGEZERO
+Load command 1
+          cmd LC_LOAD_DYLIB
+      cmdsize 56
+         name /usr/lib/libSystem.B.dylib (offset 24)
+   time stamp 2 Thu Jan  1 01:00:02 1970
+      current version 1311.0.0
+Load command 2
+          cmd LC_RPATH
+      cmdsize 32
+         path @loader_path/../lib (offset 12)
+/build/lib/libtwo.dylib (architecture x86_64):
+Load command 0
+          cmd LC_LOAD_DYLIB
+      cmdsize 64
+         name /Library/My Frameworks/libsp\xc3\xa9ce.dylib (offset 24)
+   time stamp 2 Thu Jan  1 01:00:02 1970
+/build/lib/libtwo.dylib (architecture arm64):
+Load command 0
+          cmd LC_LOAD_DYLIB
+      cmdsize 56
+         name @rpath/libarm64.dylib (offset 24)
+   time stamp 2 Thu Jan  1 01:00:02 1970
+"""
+
+
+def test_otool_commands(monkeypatch):
+    def check_output(args):
+        assert args == ("otool", "-l", *paths)
+        return OTOOL_OUTPUT
+
+    monkeypatch.setattr(subprocess, "check_output", check_output)
+    paths = [Path("/build/lib/libone.dylib"), Path("/build/lib/libtwo.dylib")]
+    commands_for_path = MachOCommand._getOtoolCommands(paths)
+    one, two = (commands_for_path[path] for path in paths)
+    assert [c.displayString() for c in one] == [
+        "Load command 0 / cmd LC_SEGMENT_64",
+        "Load command 1 / cmd LC_LOAD_DYLIB",
+        "Load command 2 / cmd LC_RPATH",
+    ]
+    assert type(one[0]) is MachOCommand
+    assert load_paths(one) == ["/usr/lib/libSystem.B.dylib"]
+    assert [c.rpath for c in one if type(c) is MachORPathCommand] == [
+        "@loader_path/../lib"
+    ]
+    # the commands of every architecture are listed
+    assert [c.displayString() for c in two] == [
+        "Load command 0 / cmd LC_LOAD_DYLIB",
+        "Load command 0 / cmd LC_LOAD_DYLIB",
+    ]
+    assert load_paths(two) == [
+        os.fsdecode(b"/Library/My Frameworks/libsp\xc3\xa9ce.dylib"),
+        "@rpath/libarm64.dylib",
+    ]
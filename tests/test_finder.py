@@ -6,6 +6,7 @@ import zipfile
 import pytest
 
 from cx_Freeze import ConstantsModule, Module, ModuleFinder
+from cx_Freeze.exception import ConfigError
 
 
 class TestModuleFinderWithConvertedNoseTests:
@@ -103,3 +104,28 @@ class TestModuleFinderWithConvertedNoseTests:
             assert isinstance(mod, Module)
         finally:
             os.unlink(egg)
+
+
+@pytest.mark.parametrize(
+    "constant, expected",
+    [
+        ("NAME", None),
+        ("NAME=1", 1),
+        ("NAME= 2 ", 2),
+        ("NAME='a=b'", "a=b"),
+        ("NAME=(1, 'x')", (1, "x")),
+        ("NAME=hello world", "hello world"),
+        ("NAME= hello world ", "hello world"),
+        ("NAME=os.getcwd()", "os.getcwd()"),
+    ],
+)
+def test_constants_module_values(constant, expected):
+    """Constant values are Python literals, otherwise the unparsed string."""
+    constants = ConstantsModule(constants=[constant])
+    assert constants.values["NAME"] == expected
+
+
+@pytest.mark.parametrize("constant", ["1NAME=1", "class=1", "=1"])
+def test_constants_module_invalid_name(constant):
+    with pytest.raises(ConfigError):
+        ConstantsModule(constants=[constant])
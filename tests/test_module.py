@@ -0,0 +1,62 @@
+import pytest
+
+from cx_Freeze.module import DistributionCache, _distributions
+
+
+@pytest.fixture()
+def fix_clear_distribution_cache():
+    """This fixture empties the caches of the installed distributions"""
+
+    def clear():
+        _distributions.cache_clear()
+        DistributionCache._from_name.cache_clear()
+        DistributionCache._missing.clear()
+
+    clear()
+    yield
+    clear()
+
+
+def write_dist_info(path, dist_info_name, name, version):
+    dist_info = path / dist_info_name
+    dist_info.mkdir(parents=True)
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    (dist_info / "METADATA").write_text(metadata)
+    (dist_info / "WHEEL").write_text("Wheel-Version: 1.0\n")
+
+
+def test_distribution_cache_first_on_path(
+    tmp_path, monkeypatch, fix_clear_distribution_cache
+):
+    """The first distribution found on sys.path shadows the others, even if
+    its dist-info directory name is not normalized."""
+    write_dist_info(tmp_path / "s1", "Foo_Bar-1.0.dist-info", "Foo_Bar", "1.0")
+    write_dist_info(tmp_path / "s2", "foo_bar-2.0.dist-info", "foo_bar", "2.0")
+    monkeypatch.syspath_prepend(str(tmp_path / "s2"))
+    monkeypatch.syspath_prepend(str(tmp_path / "s1"))
+    for name in ("foo-bar", "Foo_Bar", "foo.bar"):
+        assert DistributionCache.from_name(name).version == "1.0"
+
+
+def test_distribution_cache_interrupted(
+    tmp_path, monkeypatch, fix_clear_distribution_cache
+):
+    """A cache entry that failed to be populated is not used later."""
+    write_dist_info(tmp_path, "foo-1.0.dist-info", "foo", "1.0")
+    (tmp_path / "foo-1.0.dist-info" / "RECORD").write_text("foo.py,,\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def fail(*args):
+        raise OSError("interrupted")
+
+    write_record = DistributionCache._write_record_distinfo
+    monkeypatch.setattr(DistributionCache, "_write_record_distinfo", fail)
+    with pytest.raises(OSError):
+        DistributionCache.from_name("foo")
+    monkeypatch.setattr(
+        DistributionCache, "_write_record_distinfo", write_record
+    )
+    distribution = DistributionCache.from_name("foo")
+    record = distribution.read_text("RECORD").splitlines()
+    assert "foo-1.0.dist-info/METADATA,," in record
+    assert "foo.py,," not in record